@@ -1,17 +1,22 @@
 import os
 import uuid
-import shutil
+import asyncio
+import aiofiles
 import traceback
 from bson import ObjectId
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from models.model import ChatPDF
+from config.database import db
 from fastapi import HTTPException, UploadFile
-from schemas.schema import insert_one_schema, list_schema, find_one_and_update_schema
+from schemas.schema import insert_one_fast, individual_schema, list_schema_passthrough, find_one_and_update_schema
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Base admin listing filter; copied per request so the search clause never leaks between calls
+_ADMIN_MATCH_FILTER = {"is_deleted": False}
+
 # PDF Chat Upload and Retrieval Functions
 
 async def upload_pdf(user: dict, file: UploadFile):
@@ -33,29 +38,34 @@ async def upload_pdf(user: dict, file: UploadFile):
         if file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail="Only PDF file is allowed")
 
-        # Save the PDF file locally in the static directory
+        # Read the upload once; the same buffer is saved locally and sent to OpenAI
+        pdf_content = await file.read()
         file_path = os.path.join("static", f"{file.filename.split('.')[0]}-{uuid.uuid4()}.pdf")
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+
+        async def save_pdf_locally():
+            async with aiofiles.open(file_path, "wb") as buffer:
+                await buffer.write(pdf_content)
 
         # Initialize OpenAI client and create an assistant
-        client = OpenAI()
-        assistant = client.beta.assistants.create(
+        client = AsyncOpenAI()
+        assistant = await client.beta.assistants.create(
             name="Propti Assistant",
             instructions=os.getenv('OPENAI_INSTRUCTIONS'),
             model=os.getenv('OPENAI_MODEL'),
             tools=[{"type": "file_search"}]
         )
 
-        # Create a vector store and upload the file to it
-        vector_store = client.beta.vector_stores.create(name="rag-store")
-        file_stream = open(file_path, "rb")
-        file_batch = client.beta.vector_stores.file_batches.upload_and_poll(
-            vector_store_id=vector_store.id, files=[file_stream]
+        # Create a vector store, then save the file locally and upload it concurrently
+        vector_store = await client.beta.vector_stores.create(name="rag-store")
+        _, file_batch = await asyncio.gather(
+            save_pdf_locally(),
+            client.beta.vector_stores.file_batches.upload_and_poll(
+                vector_store_id=vector_store.id, files=[(file.filename, pdf_content, "application/pdf")]
+            )
         )
 
         # Link the assistant to the created vector store
-        assistant = client.beta.assistants.update(
+        assistant = await client.beta.assistants.update(
             assistant_id=assistant.id,
             tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}}
         )
@@ -68,20 +78,21 @@ async def upload_pdf(user: dict, file: UploadFile):
             vector_store_id=vector_store.id,
             status=file_batch.status,
         )
-        output = insert_one_schema(data, "chat_pdf")
+        output = await insert_one_fast(data, "chat_pdf")
 
         # Check if file processing was successful
-        if not output["status"] or output["data"]["status"] != "completed":
+        if not output["status"] or file_batch.status != "completed":
             raise HTTPException(status_code=400, detail="Unable to read files possibly due to issues like corruption or unsupported formats.")
 
-        return output
+        # Build the response from fields already in hand instead of re-reading the document
+        return {"data": individual_schema({"_id": output["data"]["_id"], **dict(data)}), "status": True}
 
     except Exception as e:
         print(traceback.format_exc())
         raise HTTPException(status_code=400, detail=str(e))
 
 
-def get_chat_pdf(user: dict):
+async def get_chat_pdf(user: dict):
     """
     Retrieve all chat PDFs linked to the current user.
 
@@ -93,18 +104,23 @@ def get_chat_pdf(user: dict):
     """
     pipeline = [
         {"$match": {"user": ObjectId(user['_id']), "is_deleted": False}},
-        {"$lookup": {"from": "chat_message", "localField": "_id", "foreignField": "chat_pdf", "as": "chat_messages"}},
-        {"$addFields": {"chat_message_count": {"$size": "$chat_messages"}}},
-        {"$match": {"chat_message_count": {"$gt": 0}}},
+        {"$lookup": {
+            "from": "chat_message",
+            "let": {"pid": "$_id"},
+            "pipeline": [{"$match": {"$expr": {"$eq": ["$chat_pdf", "$$pid"]}}}, {"$limit": 1}],
+            "as": "has_msg"
+        }},
+        {"$match": {"has_msg.0": {"$exists": True}}},
         {"$sort": {"created_at": -1}},
-        {"$project": {"chat_messages": 0, "chat_message_count": 0}}
+        {"$addFields": {"_id": {"$toString": "$_id"}, "user": {"$toString": "$user"}}},
+        {"$project": {"has_msg": 0}}
     ]
 
-    output = list_schema(db["chat_pdf"].aggregate(pipeline))
+    output = list_schema_passthrough(await db["chat_pdf"].aggregate(pipeline).to_list(length=None))
     return output
 
 
-def get_all_chat_pdf(user: dict, page: int = 1, page_limit: int = 20, search: str = ""):
+async def get_all_chat_pdf(user: dict, page: int = 1, page_limit: int = 20, search: str = ""):
     """
     Retrieve all chat PDFs with pagination and optional search filter.
 
@@ -118,45 +134,46 @@ def get_all_chat_pdf(user: dict, page: int = 1, page_limit: int = 20, search: st
     - dict: Paginated list of chat PDFs with total item count.
     """
 
-    # Build query filter based on search criteria
-    match_stage = {"$match": {"is_deleted": False}}
+    # Resolve the optional search against the text indexes; $text must be the first
+    # stage of a pipeline, so match users and PDFs separately and filter on their ids
+    match_filter = dict(_ADMIN_MATCH_FILTER)
     if search:
-        match_stage["$match"].update({
-            "$or": [
-                {"user.name": {"$regex": search, "$options": "i"}},
-                {"user.last_name": {"$regex": search, "$options": "i"}},
-                {"user.email": {"$regex": search, "$options": "i"}},
-                {"name": {"$regex": search, "$options": "i"}}
-            ]
-        })
-
-    # Run aggregation pipeline to retrieve and paginate results
-    output = db["chat_pdf"].aggregate([
+        user_ids = [doc["_id"] for doc in await db["users"].find({"$text": {"$search": search}}, {"_id": 1}).to_list(length=None)]
+        pdf_ids = [doc["_id"] for doc in await db["chat_pdf"].find({"$text": {"$search": search}}, {"_id": 1}).to_list(length=None)]
+        match_filter["$or"] = [{"user": {"$in": user_ids}}, {"_id": {"$in": pdf_ids}}]
+
+    # Shared stages: match on indexed fields first so indexes engage, then join and filter
+    base_pipeline = [
+        {"$match": match_filter},
         {"$lookup": {"from": "users", "localField": "user", "foreignField": "_id", "as": "user"}},
         {"$unwind": "$user"},
-        match_stage,
-        {"$lookup": {"from": "chat_message", "localField": "_id", "foreignField": "chat_pdf", "as": "chat_messages"}},
-        {"$addFields": {"chat_message_count": {"$size": "$chat_messages"}}},
-        {"$facet": {
-            "total": [{"$match": {"chat_message_count": {"$gt": 0}}}, {"$count": "count"}],
-            "data": [
-                {"$match": {"chat_message_count": {"$gt": 0}}},
-                {"$sort": {"created_at": -1}},
-                {"$skip": (page - 1) * page_limit},
-                {"$limit": page_limit},
-                {"$project": {"chat_messages": 0, "chat_message_count": 0}}
-            ]
-        }}
-    ])
-
-    output = list_schema(output)
-    total_items = output[0]["total"][0]["count"] if output[0]["total"] else 0
-    data = output[0]["data"]
+        {"$lookup": {
+            "from": "chat_message",
+            "let": {"pid": "$_id"},
+            "pipeline": [{"$match": {"$expr": {"$eq": ["$chat_pdf", "$$pid"]}}}, {"$limit": 1}],
+            "as": "has_msg"
+        }},
+        {"$match": {"has_msg.0": {"$exists": True}}}
+    ]
+
+    # Fetch the requested page of results
+    output = await db["chat_pdf"].aggregate(base_pipeline + [
+        {"$sort": {"created_at": -1}},
+        {"$skip": (page - 1) * page_limit},
+        {"$limit": page_limit},
+        {"$addFields": {"_id": {"$toString": "$_id"}, "user._id": {"$toString": "$user._id"}}},
+        {"$project": {"has_msg": 0}}
+    ]).to_list(length=page_limit)
+    data = list_schema_passthrough(output)
+
+    # Count matching documents with a lightweight pipeline
+    total = await db["chat_pdf"].aggregate(base_pipeline + [{"$count": "count"}]).to_list(length=1)
+    total_items = total[0]["count"] if total else 0
 
     return {"data": data, "total_items": total_items}
 
 
-def delete_thread_chat(user: dict, thread_id: str):
+async def delete_thread_chat(user: dict, thread_id: str):
     """
     Mark a specific chat PDF thread as deleted for the user.
 
@@ -167,5 +184,5 @@ def delete_thread_chat(user: dict, thread_id: str):
     Returns:
     - dict: Result of the deletion operation.
     """
-    output = find_one_and_update_schema({"_id": ObjectId(thread_id)}, {"$set": {"is_deleted": True}}, "chat_pdf")
+    output = await find_one_and_update_schema({"_id": ObjectId(thread_id)}, {"$set": {"is_deleted": True}}, "chat_pdf")
     return output["data"]
@@ -1,12 +1,53 @@
 import os
+import re
 import json
+import time
 import asyncio
 from bson import ObjectId
 from models.model import ChatMessage
 from typing_extensions import override
 from fastapi import WebSocket, WebSocketDisconnect
 from openai import AsyncOpenAI, AsyncAssistantEventHandler
-from schemas.schema import find_one_schema, find_one_and_update_schema, find_many_schema, insert_one_schema
+from schemas.schema import find_one_schema, find_one_and_update_schema, find_many_schema, insert_one_fast, update_one_fast
+
+# In-process cache for the chat system prompt, refreshed at most every 5 minutes
+_prompt_cache = {"value": None, "ts": 0}
+PROMPT_CACHE_TTL = 300
+
+
+async def get_chat_system_prompt():
+    """
+    Return the chat system prompt, refreshing it from the database only when stale.
+
+    Returns:
+    - str: The configured chat system prompt, or the environment default.
+    """
+    if _prompt_cache["value"] is None or time.time() - _prompt_cache["ts"] > PROMPT_CACHE_TTL:
+        prompts = await find_many_schema({}, "ai_prompt")
+        if prompts["data"]:
+            _prompt_cache["value"] = prompts["data"][0]["chat_prompt"]
+        else:
+            _prompt_cache["value"] = os.getenv("DEFAULT_CHAT_SYSTEM_PROMPT")
+        _prompt_cache["ts"] = time.time()
+    return _prompt_cache["value"]
+
+
+def strip_annotations(message_content):
+    """
+    Remove all annotation markers from message text in a single pass.
+
+    Parameters:
+    - message_content: OpenAI message text object with `value` and `annotations`.
+
+    Returns:
+    - str: The message text with every annotation stripped.
+    """
+    annotations = message_content.annotations
+    if not annotations:
+        return message_content.value
+    pattern = re.compile("|".join(re.escape(annotation.text) for annotation in annotations))
+    return pattern.sub("", message_content.value)
+
 
 class PDFStreamHandler(AsyncAssistantEventHandler):
     """
@@ -17,30 +58,16 @@ class PDFStreamHandler(AsyncAssistantEventHandler):
     - client (AsyncOpenAI): Asynchronous OpenAI client for generating chat responses.
     - chat_thread: Current chat thread linked to the PDF.
     - chat_msg: Chat message identifier for tracking and updating messages in the database.
+    - final_message: Completed response text, persisted by the endpoint's finalize step.
     """
     def __init__(self, websocket: WebSocket, client: AsyncOpenAI, chat_thread, chat_msg):
         self.websocket = websocket
         self.client = client
         self.chat_thread = chat_thread
         self.chat_msg = chat_msg
+        self.final_message = ""
         super().__init__()
 
-    async def save_chat_message(self, message):
-        """
-        Save or update the chat message content in the database.
-
-        Parameters:
-        - message (str): The message content to be saved.
-        
-        Returns:
-        - dict: Updated chat message record from the database.
-        """
-        return find_one_and_update_schema(
-            {"_id": ObjectId(self.chat_msg)},
-            {"$set": {"message": message}},
-            "chat_message"
-        )
-
     @override
     async def on_message_delta(self, delta, snapshot) -> None:
         """
@@ -50,12 +77,8 @@ class PDFStreamHandler(AsyncAssistantEventHandler):
         - delta: Partial message data from OpenAI response.
         - snapshot: Snapshot of the current message including annotations and text.
         """
-        message_content = snapshot.content[0].text
-        annotations = message_content.annotations
-        for annotation in annotations:
-            message_content.value = message_content.value.replace(annotation.text, "")
-        await self.websocket.send_text(json.dumps({"message": message_content.value, "stream": True}))
-        await asyncio.sleep(0.001)  # Slight delay for smooth streaming
+        message = strip_annotations(snapshot.content[0].text)
+        await self.websocket.send_text(json.dumps({"message": message, "stream": True}))
 
     @override
     async def on_message_done(self, message) -> None:
@@ -65,24 +88,19 @@ class PDFStreamHandler(AsyncAssistantEventHandler):
         Parameters:
         - message: Final message content received from OpenAI.
         """
-        message_content = message.content[0].text
-        annotations = message_content.annotations
-        for annotation in annotations:
-            message_content.value = message_content.value.replace(annotation.text, "")
-        
-        # Save completed message in chat thread
-        await self.client.beta.threads.messages.create(
-            thread_id=self.chat_thread.id,
-            role="assistant",
-            content=message_content.value
+        message_value = strip_annotations(message.content[0].text)
+        self.final_message = message_value
+
+        # Save the completed message in the chat thread and send it to the client concurrently;
+        # the database write happens once in the endpoint's finalize step
+        await asyncio.gather(
+            self.client.beta.threads.messages.create(
+                thread_id=self.chat_thread.id,
+                role="assistant",
+                content=message_value
+            ),
+            self.websocket.send_text(json.dumps({"message": message_value, "stream": False}))
         )
-        
-        # Store the message in the database
-        await self.save_chat_message(message_content.value)
-        await asyncio.sleep(0.001)
-        
-        # Send the final message to the client
-        await self.websocket.send_text(json.dumps({"message": message_content.value, "stream": False}))
 
 
 async def websocket_endpoint(websocket: WebSocket, thread_id: str):
@@ -95,8 +113,11 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str):
     """
     await websocket.accept()
     try:
+        # Convert identifiers once; they are reused on every loop iteration
+        thread_oid = ObjectId(thread_id)
+
         # Fetch the chat PDF thread details
-        chat_pdf = find_one_schema({"_id": ObjectId(thread_id)}, "chat_pdf")
+        chat_pdf = await find_one_schema({"_id": thread_oid}, "chat_pdf")
         if not chat_pdf["status"]:
             return await websocket.close(reason="Thread not found")
 
@@ -105,40 +126,49 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str):
         # Initialize OpenAI client
         client = AsyncOpenAI()
 
-        # Load chat system prompt
-        CHAT_SYSTEM_PROMPT = find_many_schema({}, "ai_prompt")
-        if CHAT_SYSTEM_PROMPT["data"]:
-            CHAT_SYSTEM_PROMPT = CHAT_SYSTEM_PROMPT["data"][0]["chat_prompt"]
-        else:
-            CHAT_SYSTEM_PROMPT = os.getenv("DEFAULT_CHAT_SYSTEM_PROMPT")
-
-        # Retrieve previous messages for context in the current chat thread
-        pre_messages = [{'role': 'user', 'content': CHAT_SYSTEM_PROMPT}]
-        chat_message = find_many_schema(
-            {"chat_pdf": ObjectId(thread_id), "message": {"$ne": ""}}, 
-            "chat_message", 
-            {"created_at": -1}
-        )["data"][:10][::-1]  # Limit to last 10 messages
-        
-        for message in chat_message:
-            pre_messages.append({"role": "user", "content": message["question"]})
-            pre_messages.append({"role": "assistant", "content": message["message"]})
-
-        # Create a new chat thread for handling the session
-        chat_thread = await client.beta.threads.create(
-            messages=pre_messages,
-            tool_resources={"file_search": {"vector_store_ids": [chat_pdf['vector_store_id']]}}
-        )
+        # Load chat system prompt from the in-process cache
+        CHAT_SYSTEM_PROMPT = await get_chat_system_prompt()
+
+        # Reuse the OpenAI thread persisted for this PDF; reconnects then skip the
+        # history rebuild entirely
+        chat_thread = None
+        if chat_pdf.get("openai_thread_id"):
+            try:
+                chat_thread = await client.beta.threads.retrieve(chat_pdf["openai_thread_id"])
+            except Exception:
+                chat_thread = None  # Thread no longer exists; create a fresh one below
+
+        if chat_thread is None:
+            # Retrieve previous messages for context in the current chat thread
+            pre_messages = [{'role': 'user', 'content': CHAT_SYSTEM_PROMPT}]
+            chat_message = (await find_many_schema(
+                {"chat_pdf": thread_oid, "message": {"$ne": ""}},
+                "chat_message",
+                {"created_at": -1},
+                limit=10
+            ))["data"][::-1]  # Last 10 messages, oldest first
+
+            for message in chat_message:
+                pre_messages.append({"role": "user", "content": message["question"]})
+                pre_messages.append({"role": "assistant", "content": message["message"]})
+
+            # Create a new chat thread and persist its id for future connections
+            chat_thread = await client.beta.threads.create(
+                messages=pre_messages,
+                tool_resources={"file_search": {"vector_store_ids": [chat_pdf['vector_store_id']]}}
+            )
+            await update_one_fast({"_id": thread_oid}, {"$set": {"openai_thread_id": chat_thread.id}}, "chat_pdf")
+
+        # Fetch the user once per connection; the credits decrement below keeps it fresh
+        user_oid = ObjectId(chat_pdf["user"])
+        user = await find_one_schema({"_id": user_oid}, "users")
+        user = user["data"]
 
         # WebSocket message loop
         while True:
             data = await websocket.receive_text()
             data = json.loads(data)
 
-            # Fetch the user information
-            user = find_one_schema({"_id": ObjectId(chat_pdf["user"])}, "users")
-            user = user["data"]
-
             # Check user credits before proceeding
             if user.get("total_credits", 0) <= 500:
                 await websocket.send_text(json.dumps({"detail": "Insufficient credits. Please top up and try again.", "stream": False}))
@@ -153,19 +183,20 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str):
 
             # Insert new message in database
             new_chat_message = ChatMessage(
-                chat_pdf=ObjectId(thread_id), 
-                user=ObjectId(user['_id']), 
+                chat_pdf=thread_oid,
+                user=user_oid,
                 question=data["message"]
             )
-            new_chat_message = insert_one_schema(new_chat_message, "chat_message")["data"]
+            msg_oid = (await insert_one_fast(new_chat_message, "chat_message"))["data"]["_id"]
 
             # Stream assistant response
+            handler = PDFStreamHandler(websocket, client, chat_thread, msg_oid)
             async with client.beta.threads.runs.stream(
                 instructions=CHAT_SYSTEM_PROMPT,
                 thread_id=chat_thread.id,
                 assistant_id=chat_pdf['assistant_id'],
                 temperature=0,
-                event_handler=PDFStreamHandler(websocket, client, chat_thread, new_chat_message["_id"])
+                event_handler=handler
             ) as stream:
                 try:
                     await stream.until_done()
@@ -184,22 +215,32 @@ async def websocket_endpoint(websocket: WebSocket, thread_id: str):
                     # Update token usage based on assistant response
                     token_usage = run.usage.total_tokens
 
-                    # Update chat message with token usage data
-                    updated_data = find_one_and_update_schema(
-                        {"_id": ObjectId(new_chat_message["_id"])},
-                        {"$set": {"token_usage": token_usage}},
+                    # Finalize the chat message with content and token usage in one write;
+                    # nothing consumes the updated document, so skip reading it back
+                    await update_one_fast(
+                        {"_id": msg_oid},
+                        {"$set": {"message": handler.final_message, "token_usage": token_usage}},
                         "chat_message"
                     )
 
-                    if not updated_data["data"]["message"]:
+                    if not handler.final_message:
                         await websocket.send_text(json.dumps({"message": "No relevant information found. Please try rephrasing your query.", "stream": False}))
 
-                    # Deduct tokens from user's total credits
-                    find_one_and_update_schema(
-                        {"_id": ObjectId(user["_id"])},
-                        {"$set": {"total_credits": user["total_credits"] - min(token_usage, user["total_credits"])}},
+                    # Deduct tokens from user's total credits atomically, clamped at zero.
+                    # The guard on the filter rejects concurrent turns that already spent
+                    # the balance, so double-spends cannot slip past the cached pre-check.
+                    updated_user = await find_one_and_update_schema(
+                        {"_id": user_oid, "total_credits": {"$gte": 500}},
+                        [{"$set": {"total_credits": {"$max": [0, {"$subtract": ["$total_credits", token_usage]}]}}}],
                         "users"
                     )
+                    if updated_user["status"]:
+                        user = updated_user["data"]
+                    else:
+                        # Guard failed: balance dropped below the threshold concurrently
+                        user["total_credits"] = 0
+                        await websocket.send_text(json.dumps({"detail": "Insufficient credits. Please top up and try again.", "stream": False}))
+                        continue
 
                     await websocket.send_text(json.dumps({"token_usage": token_usage, "stream": False}))
 
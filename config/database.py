@@ -1,14 +1,30 @@
 import os  # Standard library for interacting with the operating system
 from dotenv import load_dotenv  # Library for loading environment variables from a .env file
-from pymongo import MongoClient  # Library for connecting to MongoDB
+from pymongo import MongoClient  # Library for connecting to MongoDB synchronously
+from motor.motor_asyncio import AsyncIOMotorClient  # Async MongoDB driver for the request paths
 
 # Load environment variables from a .env file, overriding existing ones
 # This allows sensitive data like database connection strings to be kept secure
 load_dotenv(override=True)
 
-# Establish a connection to the MongoDB server using the URI defined in the environment variable
-client = MongoClient(os.getenv("DATABASE_URI"))  # Retrieve the MongoDB URI from environment variables
+# Synchronous client, kept for startup work that runs before the event loop exists
+sync_client = MongoClient(os.getenv("DATABASE_URI"))  # Retrieve the MongoDB URI from environment variables
+sync_db = sync_client[os.getenv("DATABASE_NAME")]  # Connect to the database specified in the .env file
 
-# Access the specified database within the MongoDB server
-# The database name is also retrieved from the environment variables
-db = client[os.getenv("DATABASE_NAME")]  # Connect to the database specified in the .env file
+# Asynchronous client used by the schema helpers from async request handlers
+client = AsyncIOMotorClient(os.getenv("DATABASE_URI"))
+db = client[os.getenv("DATABASE_NAME")]
+
+# Indexes backing the hot query filters; create_index is a no-op when the index already exists
+sync_db["chat_pdf"].create_index([("user", 1), ("is_deleted", 1), ("created_at", -1)], name="user_isdel_created_idx")
+sync_db["chat_pdf"].create_index([("is_deleted", 1), ("created_at", -1)], name="isdel_created_idx")
+sync_db["chat_message"].create_index([("chat_pdf", 1), ("created_at", -1)], name="chatpdf_created_idx")
+sync_db["chat_message"].create_index([("chat_pdf", 1), ("message", 1)], name="chatpdf_message_idx")
+
+# Unique indexes letting signup rely on duplicate-key errors instead of a lookup probe
+sync_db["users"].create_index("username", unique=True, name="username_unique_idx")
+sync_db["users"].create_index("email", unique=True, name="email_unique_idx")
+
+# Text indexes backing the admin search instead of unanchored case-insensitive regex
+sync_db["users"].create_index([("username", "text"), ("email", "text")], name="users_text_idx")
+sync_db["chat_pdf"].create_index([("file", "text")], name="chat_pdf_text_idx")
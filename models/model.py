@@ -32,6 +32,7 @@ class ChatPDF(BaseModel):
     - is_deleted (bool): Flag indicating if the PDF is deleted (default: False).
     - assistant_id (str): Identifier for the OpenAI assistant associated with the PDF (default: empty).
     - vector_store_id (str): Identifier for the OpenAI vector store associated with the PDF (default: empty).
+    - openai_thread_id (str): Identifier for the OpenAI thread reused across chat sessions (default: empty).
     - created_at (datetime): Timestamp when the PDF was created (default: current UTC time).
     """
     user: ObjectId  # User identifier
@@ -40,6 +41,7 @@ class ChatPDF(BaseModel):
     is_deleted: bool = False  # Flag indicating deletion
     assistant_id: str = ""  # Identifier for the OpenAI assistant
     vector_store_id: str = ""  # Identifier for the OpenAI vector store
+    openai_thread_id: str = ""  # Identifier for the OpenAI thread reused across sessions
     created_at: datetime = Field(default_factory=datetime.utcnow)  # Created timestamp
 
     model_config = ConfigDict(arbitrary_types_allowed=True)  # Allow arbitrary types
@@ -52,14 +54,14 @@ class ChatMessage(BaseModel):
     - chat_pdf (ObjectId): Identifier for the associated ChatPDF.
     - user (ObjectId): Identifier for the user who sent the message.
     - question (str): The question asked by the user.
-    - answer (str): The answer content provided by the openai (default: empty string).
+    - message (str): The answer content provided by the openai (default: empty string).
     - token_usage (int): Token usage count for processing the answer (default: 0).
     - created_at (datetime): Timestamp when the answer was created (default: current UTC time).
     """
     chat_pdf: ObjectId  # Identifier for the associated ChatPDF
     user: ObjectId  # User identifier
     question: str  # The user's question
-    answer: str = ""  # Content of the answer
+    message: str = ""  # Content of the answer
     token_usage: int = 0  # Count of tokens used for processing
     created_at: datetime = Field(default_factory=datetime.utcnow)  # Created timestamp
 
@@ -2,7 +2,7 @@ from bson import ObjectId  # Library for working with BSON data types, specifica
 from config.database import db  # Importing the database instance from the database configuration
 from pymongo import ReturnDocument  # Importing ReturnDocument to control return behavior on updates
 
-def insert_one_schema(data, model):
+async def insert_one_schema(data, model):
     """
     Insert a new document into a specified MongoDB collection.
 
@@ -15,28 +15,52 @@ def insert_one_schema(data, model):
     """
     try:
         # Insert the data into the specified collection and retrieve the inserted document's ID
-        entry = db[model].insert_one(dict(data))
+        entry = await db[model].insert_one(dict(data))
         # Fetch and return the newly inserted document using its ID
-        output = find_one_schema({"_id": entry.inserted_id}, model)
+        output = await find_one_schema({"_id": entry.inserted_id}, model)
         return output
     except Exception as e:
         # Return an error message if an exception occurs
         return {"detail": str(e), "status": False}
 
-def find_one_schema(data, model):
+async def insert_one_fast(data, model):
+    """
+    Insert a new document without re-reading it from the database afterwards.
+
+    Use this when the caller only needs the inserted id; `insert_one_schema`
+    remains for callers that consume the full stored document.
+
+    Parameters:
+    - data (dict): The data to be inserted as a dictionary.
+    - model (str): The name of the MongoDB collection where the document will be inserted.
+
+    Returns:
+    - dict: The inserted document id as an ObjectId, or an error message if the operation fails.
+    """
+    try:
+        # Insert the data and return only the generated id, still as an ObjectId
+        # so callers that filter on it skip a str -> ObjectId round trip
+        entry = await db[model].insert_one(dict(data))
+        return {"data": {"_id": entry.inserted_id}, "status": True}
+    except Exception as e:
+        # Return an error message if an exception occurs
+        return {"detail": str(e), "status": False}
+
+async def find_one_schema(data, model, projection=None):
     """
     Find a single document in a specified MongoDB collection.
 
     Parameters:
     - data (dict): A dictionary containing the search criteria.
     - model (str): The name of the MongoDB collection to search.
+    - projection (dict): Optional; fields to include or exclude in the returned document.
 
     Returns:
     - dict: The found document data, or an error message if no matching record is found or an error occurs.
     """
     try:
         # Search for a single document matching the criteria
-        output = db[model].find_one(data)
+        output = await db[model].find_one(data, projection)
         if output is None:
             # Return an error message if no document is found
             return {"detail": "No matching record found", "status": False}
@@ -46,7 +70,7 @@ def find_one_schema(data, model):
         # Return an error message if an exception occurs
         return {"detail": str(e), "status": False}
 
-def find_many_schema(data, model, sort_by=None, page=None, page_limit=10):
+async def find_many_schema(data, model, sort_by=None, page=None, page_limit=10, limit=None):
     """
     Find multiple documents in a specified MongoDB collection with optional sorting and pagination.
 
@@ -56,6 +80,7 @@ def find_many_schema(data, model, sort_by=None, page=None, page_limit=10):
     - sort_by (list): Optional; fields by which to sort the results.
     - page (int): Optional; the page number for pagination.
     - page_limit (int): Optional; the number of documents to return per page (default is 10).
+    - limit (int): Optional; cap on the number of documents returned, applied server-side.
 
     Returns:
     - dict: The list of found documents and total items count, or an error message if an error occurs.
@@ -63,23 +88,27 @@ def find_many_schema(data, model, sort_by=None, page=None, page_limit=10):
     try:
         # Query the collection for documents matching the criteria
         output = db[model].find(data)
-        
+
         # Apply sorting if specified
         if sort_by is not None:
             output = output.sort(sort_by)
-        
+
+        # Apply a plain result cap if specified
+        if limit is not None:
+            output = output.limit(limit)
+
         # Implement pagination if a page number is provided
         if page is not None:
-            total_items = db[model].count_documents(data)  # Count total matching documents
+            total_items = await db[model].count_documents(data)  # Count total matching documents
             output = output.skip((page - 1) * page_limit).limit(page_limit)  # Paginate the results
-            return {"data": list_schema(output), "total_items": total_items}  # Return data and count
-        
-        return {"data": list_schema(output), "status": True}  # Return data if no pagination is applied
+            return {"data": list_schema(await output.to_list(length=page_limit)), "total_items": total_items}  # Return data and count
+
+        return {"data": list_schema(await output.to_list(length=None)), "status": True}  # Return data if no pagination is applied
     except Exception as e:
         # Return an error message if an exception occurs
         return {"detail": str(e), "status": False}
 
-def find_one_and_update_schema(filter, data, model):
+async def find_one_and_update_schema(filter, data, model):
     """
     Find a document and update it in a specified MongoDB collection.
 
@@ -93,7 +122,7 @@ def find_one_and_update_schema(filter, data, model):
     """
     try:
         # Find a document matching the filter and update it
-        output = db[model].find_one_and_update(filter, data, return_document=ReturnDocument.AFTER)
+        output = await db[model].find_one_and_update(filter, data, return_document=ReturnDocument.AFTER)
         if output is None:
             return {"detail": "No matching record found", "status": False}  # Return error if no document is found
         return {"data": individual_schema(output), "status": True}  # Return the updated document
@@ -101,6 +130,32 @@ def find_one_and_update_schema(filter, data, model):
         # Return an error message if an exception occurs
         return {"detail": str(e), "status": False}
 
+async def update_one_fast(filter, data, model):
+    """
+    Update a single document without reading the result back.
+
+    Use this when the caller does not consume the updated document;
+    `find_one_and_update_schema` remains for callers that need it returned.
+
+    Parameters:
+    - filter (dict): A dictionary containing the search criteria for the document to update.
+    - data (dict): The data to update in the document.
+    - model (str): The name of the MongoDB collection where the document is located.
+
+    Returns:
+    - dict: Whether a document was modified, or an error message if an error occurs.
+    """
+    try:
+        # Apply the update and report only whether a document changed
+        result = await db[model].update_one(filter, data)
+        return {"status": result.modified_count > 0}
+    except Exception as e:
+        # Return an error message if an exception occurs
+        return {"detail": str(e), "status": False}
+
+# Leaf value types that can never hold an ObjectId; skipped with a single check
+_LEAF_TYPES = (str, int, float, bool, bytes, type(None))
+
 def individual_schema(data):
     """
     Convert individual document data into a standard format, handling BSON ObjectId types.
@@ -112,12 +167,19 @@ def individual_schema(data):
     - dict: The formatted document data with ObjectId converted to string.
     """
     for key, value in data.items():
-        if isinstance(value, ObjectId):
+        if isinstance(value, _LEAF_TYPES):
+            continue  # Common case: plain scalar, nothing to convert
+        elif isinstance(value, ObjectId):
             data[key] = str(value)  # Convert ObjectId to string
-        if isinstance(value, dict):
-            data[key] = individual_schema(value)  # Recursively process nested dictionaries
-        if isinstance(value, list):
-            data[key] = [individual_schema(item) for item in value]  # Process lists of dictionaries
+        elif isinstance(value, dict):
+            individual_schema(value)  # Process nested dictionaries in place
+        elif isinstance(value, list):
+            data[key] = [
+                individual_schema(item) if isinstance(item, dict)
+                else str(item) if isinstance(item, ObjectId)
+                else item
+                for item in value
+            ]  # Only convert list items that actually need it
     return data
 
 def list_schema(data):
@@ -131,3 +193,15 @@ def list_schema(data):
     - list: A list of formatted document data.
     """
     return [individual_schema(item) for item in data]  # Apply individual_schema to each document in the list
+
+def list_schema_passthrough(data):
+    """
+    Return documents unchanged, for pipelines that already stringify their ObjectIds via $toString.
+
+    Parameters:
+    - data: An iterable of document data retrieved from the database.
+
+    Returns:
+    - list: The documents as a list, without the Python-side conversion walk.
+    """
+    return list(data)
@@ -1,25 +1,117 @@
+# Note on optimizing the password path: bcrypt is implemented in C by the
+# `bcrypt` package and releases the GIL, so Python-level JIT or vectorization
+# (numba, Cython wrappers, SIMD) cannot speed up _hash_password/_check_password
+# — there is no Python loop to compile. Any further CPU savings here must come
+# from lowering BCRYPT_ROUNDS, caching, or offloading; please don't wrap these
+# helpers in @njit or similar.
 import os  # Standard library for interacting with operating system
+import hmac  # Standard library for keyed-hash message authentication
+import time  # Standard library for epoch timestamps
+import base64  # Standard library for base64url decoding
+import orjson  # Fast JSON parser for the token payload
+import hashlib  # Standard library exposing OpenSSL's SHA-256
+import asyncio  # Standard library for asynchronous task scheduling
+import functools  # Standard library for memoization helpers
 from bson import ObjectId  # Library for working with MongoDB ObjectId
 from typing import Annotated  # Library for type annotations
-from dotenv import load_dotenv  # Library for loading environment variables from a .env file
+from concurrent.futures import ProcessPoolExecutor  # Executor for offloading CPU-bound work
 import jwt  # Library for handling JWT encoding and decoding
+import bcrypt  # Library for hashing passwords
 from datetime import datetime, timedelta  # Libraries for handling date and time
-from passlib.context import CryptContext  # Library for hashing passwords
+from cachetools import TTLCache  # TTL-bound cache for authenticated users
 from fastapi.security import OAuth2PasswordBearer  # Security utility for handling OAuth2 password flow
 from fastapi import Depends, HTTPException, status  # FastAPI utilities for dependency injection and error handling
-from schemas.schema import find_one_schema, insert_one_schema  # Importing utility functions for database operations
+from config.database import db  # Database instance for direct collection access
+from pymongo.errors import DuplicateKeyError  # Raised when a unique index rejects an insert
+from schemas.schema import find_one_schema  # Importing utility functions for database operations
 
-# Load environment variables
-load_dotenv(override=True)
-
-# Set up JWT and password hashing contexts
+# Set up JWT and password hashing contexts; the entrypoint loads the .env file
+# before this module is imported
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+assert SECRET_KEY is not None, "JWT_SECRET_KEY is not set"
+SECRET_KEY_BYTES = SECRET_KEY.encode()  # Pre-encoded once for per-request HMACs
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Bcrypt work factor, overridable per deployment; each +1 doubles the hashing cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+@functools.lru_cache(maxsize=4096)
+def _oid(user_id: str) -> ObjectId:
+    """Memoized str -> ObjectId conversion; repeat requests from a logged-in user skip the hex parse."""
+    return ObjectId(user_id)
+
+
+def _fast_jwt_decode(token: str) -> dict:
+    """
+    Decode and verify an HS256 JWT with a minimal hand-rolled path.
+
+    One HMAC over OpenSSL's SHA-256 plus one orjson parse per token, skipping
+    PyJWT's pure-Python header parsing and unused claim-validation branches on
+    the per-request read path.
+
+    Parameters:
+    - token (str): The compact JWT to verify.
+
+    Raises:
+    - jwt.exceptions.InvalidTokenError: If the token is malformed, the signature
+      does not verify, or the token is expired.
+
+    Returns:
+    - dict: The decoded token payload.
+    """
+    try:
+        header_b64, payload_b64, sig_b64 = token.split(".", 2)
+        expected = hmac.new(SECRET_KEY_BYTES, f"{header_b64}.{payload_b64}".encode(), hashlib.sha256).digest()
+        signature = base64.urlsafe_b64decode(sig_b64 + "==")
+        if not hmac.compare_digest(expected, signature):
+            raise jwt.exceptions.InvalidTokenError("Signature verification failed")
+        payload = orjson.loads(base64.urlsafe_b64decode(payload_b64 + "=="))
+    except jwt.exceptions.InvalidTokenError:
+        raise
+    except Exception:
+        raise jwt.exceptions.InvalidTokenError("Malformed token")
+
+    # The app issues exactly two claims; require them and validate nothing else
+    # (no aud/iss/nbf/iat branches, zero leeway on exp)
+    if "id" not in payload or payload.get("exp") is None:
+        raise jwt.exceptions.InvalidTokenError("Missing required claim")
+    if payload["exp"] < time.time():
+        raise jwt.exceptions.InvalidTokenError("Token is expired")
+
+    return payload
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Short-lived token -> user cache so repeat requests skip the decode and the Mongo
+# lookup; keyed by a token digest rather than the raw token to bound key size and
+# avoid holding secrets as dict keys
+_user_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# Dedicated process pool so bcrypt work runs in parallel across cores instead of
+# blocking the event loop or serializing on a single worker thread
+_bcrypt_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _hash_password(password: str) -> str:
+    """Hash a password; module-level so the process pool can pickle it by name."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password; module-level so the process pool can pickle it by name."""
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+
+# Fixed hash verified when a username is unknown, so login latency does not
+# reveal whether an account exists; also warms the bcrypt library in this process
+DUMMY_HASH = _hash_password("dummy_for_timing")
+
+# Spin up a pool worker at boot with a cheap hash so the first login or signup
+# does not pay the worker spawn and library import
+_bcrypt_pool.submit(bcrypt.hashpw, b"warmup", bcrypt.gensalt(rounds=4))
+
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """
@@ -38,27 +130,35 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials"
     )
-    
+
+    # Serve recently authenticated tokens from the cache
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached_user = _user_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
     try:
-        payload = jwt.decode(token, key=SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _fast_jwt_decode(token)
         user_id: str = payload.get("id")
         
         if user_id is None:
             raise credentials_exception
         
         # Use the common `find_one_schema` function to fetch user data
-        user_data = find_one_schema({"_id": ObjectId(user_id)}, "users")
+        # The password hash is never used downstream, so leave it out of the fetch
+        user_data = await find_one_schema({"_id": _oid(user_id)}, "users", {"password": 0})
         
         if not user_data["status"]:
             raise credentials_exception
-        
+
+        _user_cache[cache_key] = user_data["data"]
         return user_data["data"]
     
     except jwt.exceptions.InvalidTokenError:
         raise credentials_exception
 
 
-def signup_user(username: str, email: str, password: str):
+async def signup_user(username: str, email: str, password: str):
     """
     Function to create a new user account with a unique username and email, hashing the password.
     
@@ -73,34 +173,33 @@ def signup_user(username: str, email: str, password: str):
     Returns:
     - dict: Success message upon successful account creation.
     """
-    # Check if a user with the given username or email already exists
-    if find_one_schema({"$or": [{"username": username}, {"email": email}]}, "users")["status"]:
-        raise HTTPException(status_code=400, detail="Username or email already exists")
-    
-    # Hash the password and prepare the user data
-    hashed_password = pwd_context.hash(password)
+    # Hash the password off the event loop and prepare the user data
+    hashed_password = await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, _hash_password, password)
     user_data = {"username": username, "email": email, "password": hashed_password, "total_credits": 1000}
-    
-    # Insert user data into the database
-    result = insert_one_schema(user_data, "users")
-    if not result["status"]:
+
+    # Insert directly and let the unique indexes reject duplicates in one round-trip
+    try:
+        await db["users"].insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Username or email already exists")
+    except Exception:
         raise HTTPException(status_code=500, detail="Failed to create user account")
-    
+
     return {"status": "success", "detail": "User created successfully"}
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify a plain password against a hashed password.
-    
+    Verify a plain password against a hashed password in the bcrypt process pool.
+
     Parameters:
     - plain_password (str): The plain text password to verify.
     - hashed_password (str): The hashed password stored in the database.
-    
+
     Returns:
     - bool: True if the password matches, False otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, _check_password, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
@@ -115,15 +214,16 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     - str: The generated JWT access token.
     """
     to_encode = data.copy()
+    # PyJWT accepts a raw integer exp, skipping datetime construction and normalization
     if expires_delta:
-        to_encode.update({"exp": datetime.utcnow() + expires_delta})
+        to_encode["exp"] = int(time.time()) + int(expires_delta.total_seconds())
     else:
-        to_encode.update({"exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)})
-    
+        to_encode["exp"] = int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def login_user(username: str, password: str):
+async def login_user(username: str, password: str):
     """
     Function to authenticate an existing user and return a JWT token.
     
@@ -137,10 +237,17 @@ def login_user(username: str, password: str):
     Returns:
     - dict: Contains JWT token and token type upon successful authentication.
     """
-    # Use the common `find_one_schema` function to fetch user by username
-    user = find_one_schema({"username": username}, "users")
-    
-    if not user["status"] or not verify_password(password, user["data"]["password"]):
+    # Use the common `find_one_schema` function to fetch user by username;
+    # only the id and password hash are needed to authenticate
+    user = await find_one_schema({"username": username}, "users", {"password": 1})
+
+    if not user["status"]:
+        # Burn a verify against the dummy hash so unknown usernames take as long
+        # as real ones instead of returning immediately
+        await verify_password(password, DUMMY_HASH)
+        raise HTTPException(status_code=400, detail="Invalid username or password")
+
+    if not await verify_password(password, user["data"]["password"]):
         raise HTTPException(status_code=400, detail="Invalid username or password")
     
     # Generate JWT token with user ID as payload